@@ -0,0 +1,420 @@
+# Batched post-composite degradation for the generated super/subscript images.
+#
+# All operations work on a stack of equally sized images, shape (N, H, W, 3),
+# so the per-image cost is a handful of NumPy array ops instead of a full
+# PIL round trip per augmentation.
+
+import numpy as np
+
+# Standard JPEG quantisation tables (ITU-T T.81, Annex K)
+JPEG_LUMA_TABLE = np.array([
+    [16, 11, 10, 16, 24, 40, 51, 61],
+    [12, 12, 14, 19, 26, 58, 60, 55],
+    [14, 13, 16, 24, 40, 57, 69, 56],
+    [14, 17, 22, 29, 51, 87, 80, 62],
+    [18, 22, 37, 56, 68, 109, 103, 77],
+    [24, 35, 55, 64, 81, 104, 113, 92],
+    [49, 64, 78, 87, 103, 121, 120, 101],
+    [72, 92, 95, 98, 112, 100, 103, 99],
+], dtype=np.float32)
+
+JPEG_CHROMA_TABLE = np.array([
+    [17, 18, 24, 47, 99, 99, 99, 99],
+    [18, 21, 26, 66, 99, 99, 99, 99],
+    [24, 26, 56, 99, 99, 99, 99, 99],
+    [47, 66, 99, 99, 99, 99, 99, 99],
+    [99, 99, 99, 99, 99, 99, 99, 99],
+    [99, 99, 99, 99, 99, 99, 99, 99],
+    [99, 99, 99, 99, 99, 99, 99, 99],
+    [99, 99, 99, 99, 99, 99, 99, 99],
+], dtype=np.float32)
+
+
+def _dct_matrix(n=8):
+    """Orthonormal DCT-II basis, so that coeffs = D @ block @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    d[0, :] = np.sqrt(1.0 / n)
+    return d.astype(np.float32)
+
+
+_DCT_8 = _dct_matrix(8)
+
+def _draw(rng, low, high, size):
+    low, high = float(low), float(high)
+    if low == high:
+        return np.full(size, low, dtype=np.float32)
+    return rng.uniform(low, high, size).astype(np.float32)
+
+
+def affine_batch(images, skew_deg, rotation_deg):
+    """
+    Apply a per-sample horizontal skew and rotation about the image centre.
+
+    Parameters:
+    -----------
+    images : ndarray
+        Channel-planar float32 array of shape (N, C, H, W)
+    skew_deg : ndarray
+        Horizontal shear angle in degrees, shape (N,)
+    rotation_deg : ndarray
+        Rotation angle in degrees, shape (N,)
+
+    Returns:
+    --------
+    ndarray
+        Warped images, same shape as the input. Pixels sampled from outside
+        the image repeat the border so no black corners are introduced.
+    """
+    n, c, h, w = images.shape
+    theta = np.deg2rad(rotation_deg)
+    shear = np.tan(np.deg2rad(skew_deg))
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+
+    # Forward map is R @ S with S = [[1, shear], [0, 1]]; we need its inverse
+    # S^-1 @ R^-1 to look up the source pixel of every output pixel
+    inv = np.empty((n, 2, 2, 1, 1), dtype=np.float32)
+    inv[:, 0, 0, 0, 0] = cos_t + shear * sin_t
+    inv[:, 0, 1, 0, 0] = sin_t - shear * cos_t
+    inv[:, 1, 0, 0, 0] = -sin_t
+    inv[:, 1, 1, 0, 0] = cos_t
+
+    cx, cy = (w - 1) / 2.0, (h - 1) / 2.0
+    xs = (np.arange(w, dtype=np.float32) - cx)[None, None, :]
+    ys = (np.arange(h, dtype=np.float32) - cy)[None, :, None]
+    src_x = inv[:, 0, 0] * xs + (inv[:, 0, 1] * ys + cx)
+    src_y = inv[:, 1, 0] * xs + (inv[:, 1, 1] * ys + cy)
+    np.clip(src_x, 0, w - 1, out=src_x)
+    np.clip(src_y, 0, h - 1, out=src_y)
+
+    x0 = src_x.astype(np.intp)
+    y0 = src_y.astype(np.intp)
+    wx = (src_x - x0)[:, None]
+    wy = (src_y - y0)[:, None]
+    # Steps to the +1 neighbours, zero on the last column / row so they stay
+    # in bounds (their weight is 0 there anyway)
+    dx = (x0 < w - 1)[:, None]
+    dy = (y0 < h - 1)[:, None] * w
+
+    # Bilinear interpolation. The layout is channel-planar so each gather and
+    # each lerp runs over whole image planes rather than 3-element pixels.
+    offsets = (np.arange(n) * (c * h * w))[:, None, None, None] + (np.arange(c) * (h * w))[None, :, None, None]
+    idx = offsets + (y0 * w + x0)[:, None]
+    # Indices are always in range; 'wrap' just avoids the slower bounds check
+    # of the default mode
+    flat = images.reshape(-1)
+    p00 = flat.take(idx, mode='wrap')
+    idx += dx
+    p01 = flat.take(idx, mode='wrap')
+    idx += dy
+    p11 = flat.take(idx, mode='wrap')
+    idx -= dx
+    p10 = flat.take(idx, mode='wrap')
+    p01 -= p00
+    p01 *= wx
+    p00 += p01
+    p11 -= p10
+    p11 *= wx
+    p10 += p11
+    p10 -= p00
+    p10 *= wy
+    p00 += p10
+    return p00
+
+
+def gaussian_blur_batch(images, sigma):
+    """
+    Separable Gaussian blur with a per-sample sigma.
+
+    All kernels share the radius of the largest sigma in the batch (smaller
+    kernels are zero-padded), so the batch is blurred with one pass of
+    shifted multiply-adds per axis.
+
+    Parameters:
+    -----------
+    images : ndarray
+        Channel-planar float32 array of shape (N, C, H, W)
+    sigma : ndarray
+        Blur standard deviation in pixels, shape (N,). 0 leaves a sample unchanged.
+    """
+    max_sigma = float(np.max(sigma)) if len(sigma) else 0.0
+    if max_sigma <= 0:
+        return images
+
+    radius = int(np.ceil(3 * max_sigma))
+    taps = np.arange(-radius, radius + 1, dtype=np.float32)
+    safe_sigma = np.maximum(sigma, 1e-6)[:, None]
+    kernels = np.exp(-0.5 * (taps[None, :] / safe_sigma) ** 2)
+    # Truncate every kernel at its own 3 sigma, so a sample's result does not
+    # depend on which other samples share the batch
+    kernels[np.abs(taps)[None, :] > np.ceil(3 * safe_sigma)] = 0
+    kernels[sigma <= 0] = (taps == 0).astype(np.float32)
+    kernels /= kernels.sum(axis=1, keepdims=True)
+    kernels = kernels.astype(np.float32)[:, :, None, None, None]
+
+    out = _blur_axis(images, kernels, radius, axis=3)
+    return _blur_axis(out, kernels, radius, axis=2)
+
+
+def _blur_axis(images, kernels, radius, axis):
+    # Edge-replicate into a preallocated buffer (np.pad has a lot of per-call
+    # overhead), then add symmetric taps in pairs
+    size = images.shape[axis]
+    padded_shape = list(images.shape)
+    padded_shape[axis] += 2 * radius
+    padded = np.empty(padded_shape, dtype=np.float32)
+
+    def window(arr, start, stop):
+        index = [slice(None)] * 4
+        index[axis] = slice(start, stop)
+        return arr[tuple(index)]
+
+    window(padded, radius, radius + size)[...] = images
+    window(padded, 0, radius)[...] = window(images, 0, 1)
+    window(padded, radius + size, size + 2 * radius)[...] = window(images, size - 1, size)
+
+    out = images * kernels[:, radius]
+    tmp = np.empty_like(images)
+    for d in range(1, radius + 1):
+        np.add(window(padded, radius - d, radius - d + size), window(padded, radius + d, radius + d + size), out=tmp)
+        tmp *= kernels[:, radius + d]
+        out += tmp
+    return out
+
+
+def contrast_jitter_batch(images, factor):
+    """Scale each sample's deviation from its own mean intensity by factor, shape (N,)"""
+    mean = images.mean(axis=(1, 2, 3), keepdims=True)
+    return (images - mean) * factor[:, None, None, None] + mean
+
+
+def sensor_noise_batch(images, noise_std, rng):
+    """
+    Add zero-mean Gaussian noise with a per-sample standard deviation.
+
+    Parameters:
+    -----------
+    images : ndarray
+        Channel-planar float32 array of shape (N, C, H, W)
+    noise_std : ndarray
+        Noise standard deviation in grey levels, shape (N,)
+    rng : numpy.random.Generator or numpy.random.RandomState
+        Source of the noise; samples are drawn one after another in batch order
+    """
+    out = images.copy()
+    for i in range(len(images)):
+        if isinstance(rng, np.random.Generator):
+            # float32 ziggurat draws are much faster than the legacy normal
+            noise = rng.standard_normal(images.shape[1:], dtype=np.float32)
+        else:
+            noise = rng.normal(0.0, 1.0, images.shape[1:]).astype(np.float32)
+        noise *= np.float32(noise_std[i])
+        out[i] += noise
+    return out
+
+
+def _quality_tables(base_table, quality):
+    # IJG quality scaling, as used by libjpeg / PIL
+    quality = np.clip(quality, 1, 100)
+    scale = np.where(quality < 50, 5000.0 / quality, 200.0 - 2.0 * quality)
+    tables = np.floor((base_table[None] * scale[:, None, None] + 50) / 100)
+    return np.clip(tables, 1, 255).astype(np.float32)
+
+
+def _jpeg_plane_roundtrip(plane, tables):
+    # plane: (N, h, w) with h, w multiples of 8; tables: (N, 8, 8).
+    # The 2-D DCT is done as two large matmuls (along rows, then columns)
+    # instead of one tiny 8x8 matmul per block.
+    n, h, w = plane.shape
+    x = (plane - 128.0).reshape(n, h, w // 8, 8) @ _DCT_8.T
+    x = _DCT_8 @ x.reshape(n, h // 8, 8, w)
+    x = x.reshape(n, h // 8, 8, w // 8, 8)
+    t = tables[:, None, :, None, :]
+    x /= t
+    np.round(x, out=x)
+    x *= t
+    x = _DCT_8.T @ x.reshape(n, h // 8, 8, w)
+    x = x.reshape(n, h, w // 8, 8) @ _DCT_8
+    return x.reshape(n, h, w) + 128.0
+
+
+def _subsample_2x2(plane):
+    # Average each 2x2 block; summing strided views is much faster than mean()
+    return (plane[:, ::2, ::2] + plane[:, 1::2, ::2] + plane[:, ::2, 1::2] + plane[:, 1::2, 1::2]) * 0.25
+
+
+def jpeg_compress_batch(images, quality, chroma_subsampling=True):
+    """
+    Simulate JPEG re-compression artefacts with a per-sample quality.
+
+    Reproduces the lossy part of baseline JPEG (YCbCr conversion, optional
+    4:2:0 chroma subsampling, 8x8 DCT quantisation with IJG-scaled tables)
+    directly on the array stack, without encoding each image to bytes.
+
+    Parameters:
+    -----------
+    images : ndarray
+        Channel-planar float32 RGB array of shape (N, 3, H, W) in [0, 255]
+    quality : ndarray
+        JPEG quality in [1, 100], shape (N,)
+    chroma_subsampling : bool
+        If True, Cb/Cr are averaged over 2x2 blocks like a default JPEG encoder
+    """
+    n, _, h, w = images.shape
+    block = 16 if chroma_subsampling else 8
+    pad_h, pad_w = -h % block, -w % block
+    x = np.pad(np.clip(images, 0, 255), ((0, 0), (0, 0), (0, pad_h), (0, pad_w)), mode='edge')
+    r, g, b = x[:, 0], x[:, 1], x[:, 2]
+
+    y = 0.299 * r + 0.587 * g + 0.114 * b
+    cb = -0.168736 * r - 0.331264 * g + 0.5 * b + 128.0
+    cr = 0.5 * r - 0.418688 * g - 0.081312 * b + 128.0
+
+    luma_tables = _quality_tables(JPEG_LUMA_TABLE, quality)
+    chroma_tables = _quality_tables(JPEG_CHROMA_TABLE, quality)
+
+    y = _jpeg_plane_roundtrip(y, luma_tables)
+    if chroma_subsampling:
+        cb = _subsample_2x2(cb)
+        cr = _subsample_2x2(cr)
+    cb = _jpeg_plane_roundtrip(cb, chroma_tables)
+    cr = _jpeg_plane_roundtrip(cr, chroma_tables)
+    if chroma_subsampling:
+        cb = cb.repeat(2, axis=1).repeat(2, axis=2)
+        cr = cr.repeat(2, axis=1).repeat(2, axis=2)
+
+    cb -= 128.0
+    cr -= 128.0
+    out = np.stack([
+        y + 1.402 * cr,
+        y - 0.344136 * cb - 0.714136 * cr,
+        y + 1.772 * cb,
+    ], axis=1)
+    return out[:, :, :h, :w]
+
+
+def augment_batch(
+    images,
+    rng=None,
+    skew_range=(-8.0, 8.0),
+    rotation_range=(-2.0, 2.0),
+    blur_sigma_range=(0.0, 1.2),
+    noise_std_range=(0.0, 8.0),
+    contrast_range=(0.7, 1.2),
+    jpeg_quality_range=(30, 95),
+    affine_prob=0.5,
+    blur_prob=0.5,
+    noise_prob=0.5,
+    contrast_prob=0.5,
+    jpeg_prob=0.5,
+    chunk_size=8,
+):
+    """
+    Degrade a stack of equally sized images with skew/rotation, blur,
+    contrast jitter, sensor noise and JPEG artefacts (applied in that order).
+
+    Each stage only touches the samples it was drawn for, and the batch is
+    processed chunk_size samples at a time so every stage works on data that
+    is still in cache.
+
+    Parameters:
+    -----------
+    images : ndarray
+        uint8 RGB array of shape (N, H, W, 3)
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Source of the per-sample parameters. Defaults to the global
+        np.random state, so a run seeded with np.random.seed() is reproducible.
+    *_range : tuple
+        (low, high) bounds each per-sample parameter is drawn uniformly from
+    *_prob : float
+        Probability that each sample receives the corresponding augmentation
+    chunk_size : int
+        Number of samples pushed through all stages together
+
+    Returns:
+    --------
+    ndarray
+        uint8 array of the same shape as images
+    """
+    if rng is None:
+        rng = np.random
+
+    n = images.shape[0]
+
+    # Draw every parameter up front so the random stream does not depend on
+    # which augmentations end up being applied. Pixel noise is drawn after
+    # these, one noisy sample at a time in batch order, so the output does not
+    # depend on chunk_size either.
+    use_affine = rng.uniform(0, 1, n) < affine_prob
+    use_blur = rng.uniform(0, 1, n) < blur_prob
+    use_contrast = rng.uniform(0, 1, n) < contrast_prob
+    use_noise = rng.uniform(0, 1, n) < noise_prob
+    use_jpeg = rng.uniform(0, 1, n) < jpeg_prob
+    skew = _draw(rng, *skew_range, n) * use_affine
+    rotation = _draw(rng, *rotation_range, n) * use_affine
+    sigma = _draw(rng, *blur_sigma_range, n) * use_blur
+    contrast = np.where(use_contrast, _draw(rng, *contrast_range, n), 1.0).astype(np.float32)
+    noise_std = _draw(rng, *noise_std_range, n) * use_noise
+    quality = np.round(_draw(rng, *jpeg_quality_range, n))
+
+    out = np.empty_like(images)
+    for start in range(0, n, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        # Work channel-planar, (N, C, H, W), so per-sample parameters
+        # broadcast over whole image planes
+        x = images[chunk].transpose(0, 3, 1, 2).astype(np.float32)
+
+        idx = np.flatnonzero(use_affine[chunk])
+        if len(idx):
+            x[idx] = affine_batch(x[idx], skew[chunk][idx], rotation[chunk][idx])
+        idx = np.flatnonzero(sigma[chunk] > 0)
+        if len(idx):
+            x[idx] = gaussian_blur_batch(x[idx], sigma[chunk][idx])
+        idx = np.flatnonzero(contrast[chunk] != 1.0)
+        if len(idx):
+            x[idx] = contrast_jitter_batch(x[idx], contrast[chunk][idx])
+        idx = np.flatnonzero(noise_std[chunk] > 0)
+        if len(idx):
+            x[idx] = sensor_noise_batch(x[idx], noise_std[chunk][idx], rng)
+        idx = np.flatnonzero(use_jpeg[chunk])
+        if len(idx):
+            x[idx] = jpeg_compress_batch(x[idx], quality[chunk][idx])
+
+        np.round(x, out=x)
+        np.clip(x, 0, 255, out=x)
+        out[chunk] = x.transpose(0, 2, 3, 1)
+    return out
+
+
+def augment_images(images, rng=None, **augment_kwargs):
+    """
+    Augment a list of PIL images, batching together images that share a size.
+
+    Parameters:
+    -----------
+    images : list of PIL.Image
+        Composited images, e.g. the output of overlay_on_background
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        See augment_batch
+    augment_kwargs :
+        Forwarded to augment_batch
+
+    Returns:
+    --------
+    list of PIL.Image
+        Augmented RGB images, in the same order as the input
+    """
+    from PIL import Image
+
+    groups = {}
+    for i, img in enumerate(images):
+        groups.setdefault(img.size, []).append(i)
+
+    results = [None] * len(images)
+    for indices in groups.values():
+        batch = np.stack([np.asarray(images[i].convert('RGB')) for i in indices])
+        augmented = augment_batch(batch, rng=rng, **augment_kwargs)
+        for i, arr in zip(indices, augmented):
+            results[i] = Image.fromarray(arr)
+    return results
@@ -0,0 +1,76 @@
+# Cold-start import budget for the generator modules.
+#
+# Each module is imported in a fresh interpreter, the way a spawned worker
+# would, and must not pull in any of the heavy dependencies that are meant to
+# be imported lazily. Its import time is measured relative to `import numpy`
+# in the same interpreter, so the budget holds on slow hosts and cold caches.
+#
+# Usage: python import_budget.py   (exits non-zero if the budget is exceeded)
+# The same checks run under pytest from test_import_budget.py.
+
+import os
+import subprocess
+import sys
+
+MODULES = ["suscript_superscript_generator", "sample_distribution", "image_augmentation"]
+
+# Time a module may add on top of `import numpy`, as a fraction of numpy's own
+# import time. Measured on a single-core Linux VM: numpy 0.10s, each module
+# 0.0002-0.006s on top. For scale, scipy.stats adds about 0.7s (7x numpy)
+# and matplotlib.pyplot several times numpy as well.
+IMPORT_TIME_MARGIN = 1.0
+
+LAZY_MODULES = ["matplotlib", "matplotlib.pyplot", "PIL", "scipy", "pandas"]
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import numpy
+numpy_done = time.perf_counter()
+import {module}
+module_done = time.perf_counter()
+loaded = [m for m in {lazy!r} if m in sys.modules]
+print(numpy_done - start)
+print(module_done - numpy_done)
+print(",".join(loaded))
+"""
+
+
+def measure_import(module, repeats=3):
+    """
+    Import module in a fresh interpreter, after numpy, and return
+    (numpy import time, extra time for module, lazily imported modules that
+    were loaded anyway). Times are the best of `repeats` runs.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    numpy_time, extra, loaded = float("inf"), float("inf"), []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=here, capture_output=True, text=True, check=True,
+        ).stdout.splitlines()
+        numpy_time = min(numpy_time, float(out[0]))
+        extra = min(extra, float(out[1]))
+        loaded = [m for m in out[2].split(",") if m] if len(out) > 2 else []
+    return numpy_time, extra, loaded
+
+
+def check_import_budget(modules=MODULES, margin=IMPORT_TIME_MARGIN):
+    """Return a list of budget violations, empty if every module is within budget"""
+    failures = []
+    for module in modules:
+        numpy_time, extra, loaded = measure_import(module)
+        limit = margin * numpy_time
+        print(f"{module}: numpy {numpy_time:.3f}s + {extra:.3f}s (budget +{limit:.3f}s)")
+        if extra > limit:
+            failures.append(f"{module} adds {extra:.3f}s to import on top of numpy, budget is {limit:.3f}s")
+        if loaded:
+            failures.append(f"{module} eagerly imports {', '.join(loaded)}")
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_import_budget()
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
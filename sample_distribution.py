@@ -73,8 +73,63 @@
 
 ###------------------------------------------------
 import numpy as np
-from scipy import stats
-import matplotlib.pyplot as plt
+
+
+def _standard_truncnorm_round(a, b, n):
+    """
+    One vectorised rejection round for a standard normal truncated to [a, b].
+
+    The proposal is picked so the acceptance rate stays bounded below for any
+    interval (Robert, 1995), which keeps far-tail and very narrow intervals
+    from stalling the sampler:
+      - interval containing 0, width >= 1: plain normal proposal
+      - interval containing 0, width < 1: uniform proposal
+      - interval in the tail, width >= 1/lam: shifted exponential proposal
+      - interval in the tail, width < 1/lam: uniform proposal
+    """
+    if a <= 0 <= b:
+        if b - a >= 1:
+            z = np.random.normal(0.0, 1.0, size=n)
+            return z[(z >= a) & (z <= b)]
+        z = np.random.uniform(a, b, size=n)
+        return z[np.random.uniform(0, 1, size=n) <= np.exp(-0.5 * z ** 2)]
+
+    # Work on the upper tail; the lower tail is its mirror image
+    sign = 1.0
+    if b < 0:
+        a, b, sign = -b, -a, -1.0
+    lam = (a + np.sqrt(a ** 2 + 4)) / 2
+    if b - a >= 1 / lam:
+        z = a + np.random.exponential(1 / lam, size=n)
+        keep = (z <= b) & (np.random.uniform(0, 1, size=n) <= np.exp(-0.5 * (z - lam) ** 2))
+    else:
+        z = np.random.uniform(a, b, size=n)
+        keep = np.random.uniform(0, 1, size=n) <= np.exp(0.5 * (a ** 2 - z ** 2))
+    return sign * z[keep]
+
+
+def truncnorm_rvs(low, high, loc, scale, size=1):
+    """
+    Sample a normal distribution truncated to [low, high] by rejection.
+
+    Uses only the global np.random state, so sampling needs no scipy import.
+    Draws are made in vectorised batches until `size` samples are accepted.
+    """
+    if not low < high:
+        raise ValueError(f"low must be smaller than high, got low={low}, high={high}")
+    if not scale > 0:
+        raise ValueError(f"scale must be positive, got {scale}")
+
+    a = (low - loc) / scale
+    b = (high - loc) / scale
+    samples = np.empty(0)
+    # Oversample so typical bounds are filled in a single pass
+    while samples.size < size:
+        needed = size - samples.size
+        draws = _standard_truncnorm_round(a, b, max(2 * needed, 64))
+        samples = np.concatenate([samples, draws[:needed]])
+    return np.clip(loc + scale * samples, low, high)
+
 
 def sample_font_size(min_size=5, max_size=60, peak=11.5, concentration=3.0, num_samples=1):
     """
@@ -98,13 +153,8 @@ def sample_font_size(min_size=5, max_size=60, peak=11.5, concentration=3.0, num_
     int or ndarray
         Random font size(s) between min_size and max_size
     """
-    # Create a truncated normal distribution
-    a = (min_size - peak) / concentration
-    b = (max_size - peak) / concentration
-    distribution = stats.truncnorm(a, b, loc=peak, scale=concentration)
-    
-    # Sample from the distribution
-    samples = distribution.rvs(size=num_samples)
+    # Sample from a truncated normal distribution
+    samples = truncnorm_rvs(min_size, max_size, loc=peak, scale=concentration, size=num_samples)
     
     # Round to integers (for font sizes)
     rounded_samples = np.round(samples).astype(int)
@@ -122,16 +172,10 @@ def sample_font_size_mixture(min_size=5, max_size=60, num_samples=1):
     # First distribution focused on 8-14 range
     peak1 = 11.5
     concentration1 = 1.5
-    a1 = (min_size - peak1) / concentration1
-    b1 = (max_size - peak1) / concentration1
-    dist1 = stats.truncnorm(a1, b1, loc=peak1, scale=concentration1)
     
     # Second distribution allowing for larger sizes
     peak2 = 25
     concentration2 = 10
-    a2 = (min_size - peak2) / concentration2
-    b2 = (max_size - peak2) / concentration2
-    dist2 = stats.truncnorm(a2, b2, loc=peak2, scale=concentration2)
     
     # Mix the distributions (80% from first, 20% from second)
     mixture_weights = [0.8, 0.2]
@@ -141,8 +185,8 @@ def sample_font_size_mixture(min_size=5, max_size=60, num_samples=1):
     n2 = num_samples - n1
     
     # Sample from both distributions
-    samples1 = dist1.rvs(size=n1)
-    samples2 = dist2.rvs(size=n2)
+    samples1 = truncnorm_rvs(min_size, max_size, loc=peak1, scale=concentration1, size=n1)
+    samples2 = truncnorm_rvs(min_size, max_size, loc=peak2, scale=concentration2, size=n2)
     
     # Combine samples
     samples = np.concatenate([samples1, samples2])
@@ -158,6 +202,8 @@ def sample_font_size_mixture(min_size=5, max_size=60, num_samples=1):
     return rounded_samples
 # # Example usage
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     # Generate 10000 samples to visualize the distribution
     # samples = sample_font_size(min_size=2, max_size=10, peak=5.5, concentration=5.0, num_samples=100000)
 
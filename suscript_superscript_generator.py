@@ -1,17 +1,26 @@
-import matplotlib.pyplot as plt
-from matplotlib import rcParams
-from matplotlib.font_manager import FontProperties
-import matplotlib.image as mpimg
+# matplotlib, pyplot and PIL are imported on first use rather than at module
+# load, so short-lived workers and CLI calls do not pay for them up front.
 import numpy as np
-from PIL import Image
-import pandas as pd
-import sys
-import PIL
 import os
 from io import BytesIO
+from typing import TYPE_CHECKING
+from image_augmentation import augment_images
 # from generated_color_by_contrast import ensure_readable_colors, contrast_ratio
 
-def crop_extra_boundary(image:PIL.Image) -> PIL.Image:
+if TYPE_CHECKING:
+    import PIL.Image
+
+
+def _pyplot():
+    """Import pyplot on first use with the non-interactive Agg backend forced"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def crop_extra_boundary(image:"PIL.Image.Image") -> "PIL.Image.Image":
+    from PIL import Image
     img_array = np.array(image)
     
     # For transparent PNG, find the alpha channel (if it exists)
@@ -111,6 +120,11 @@ def generate_text_image(
         combined_text = main_text
     
     
+    plt = _pyplot()
+    from matplotlib import rcParams
+    from matplotlib.font_manager import FontProperties
+    from PIL import Image
+
     # Set font
     font_prop = None
     rcParams['text.usetex'] = True
@@ -200,7 +214,8 @@ def gen_image_random_sample_(wdith_range_bd, height_range_bd, text_size, backgro
     return cropped_img_rgb, cropped_image, [sample_width_left, sample_height_top, sample_width_right, sample_height_bottom]
 
 
-def sample_from_bgImage(background_img:Image, text_img_size:list, pad_all:list, generated_text_color:tuple, min_contrast:float =4.5):
+def sample_from_bgImage(background_img:"PIL.Image.Image", text_img_size:list, pad_all:list, generated_text_color:tuple, min_contrast:float =4.5):
+    from PIL import Image
     img_w, img_h = background_img.size
     text_w, text_h = text_img_size
     pad_left, pad_top, pad_right, pad_bottom = pad_all
@@ -272,7 +287,16 @@ def overlay_on_background(
     scale_background : bool
         If True, scales the background to match text size
         If False, crops the background to match text size
+
+    Returns:
+    --------
+    PIL.Image or None
+        The combined image, or None if overlaying failed. If output_path is
+        None the image is not saved, so it can be passed through
+        augment_and_save first.
     """
+    from PIL import Image
+
     try:
         # Open the images
         text_img = gen_text_image #Image.open(text_image_path)        
@@ -310,13 +334,41 @@ def overlay_on_background(
     
         # Save the combined image
         # combined_img.save(output_path)
-        print(f"Combined image saved to {output_path}")
         background_img_ext.paste(combined_img, (pad_left, pad_top))
-        background_img_ext.save(output_path)
+        if output_path is not None:
+            background_img_ext.save(output_path)
+            print(f"Combined image saved to {output_path}")
+        return background_img_ext
     
     
     except Exception as e:
         print(f"Error overlaying images: {e}")
+        return None
+
+
+def augment_and_save(combined_images, output_paths, rng=None, **augment_kwargs):
+    """
+    Degrade the overlaid images in batches and save them
+    
+    Parameters:
+    -----------
+    combined_images : list of PIL.Image
+        Images returned by overlay_on_background(..., output_path=None).
+        None entries (failed overlays) are skipped.
+    output_paths : list of str
+        Where to save each image
+    rng : numpy.random.Generator or numpy.random.RandomState, optional
+        Defaults to the global np.random state seeded for the run
+    augment_kwargs :
+        Skew, blur, noise, contrast and JPEG settings for image_augmentation.augment_batch
+    """
+    pairs = [(img, path) for img, path in zip(combined_images, output_paths) if img is not None]
+    if not pairs:
+        return
+    images, paths = zip(*pairs)
+    for img, path in zip(augment_images(list(images), rng=rng, **augment_kwargs), paths):
+        img.save(path)
+        print(f"Augmented image saved to {path}")
 
 
 def normalize_rgba(rgba):
@@ -328,6 +380,8 @@ def denormalize_rgba(rgba):
 
 # Example usage
 if __name__ == "__main__":
+    # Never probe for a GUI backend, even if something imports pyplot before _pyplot() does
+    os.environ.setdefault("MPLBACKEND", "Agg")
     
     # Step 1: Generate the text image  
     generated_text_color = (0.0, 0.0, 0.0, 1.0) # Normalized RGBA 1.0 means no transpancy
@@ -344,6 +398,25 @@ if __name__ == "__main__":
     background_img = "/media/Tairen_Chen/Data/background_images/light_background.jp"
     pad_all = [0,0,0,0] # can generate random pixel values for the padding
     
+    # Add step 3 parameters
+    # Degrade the composites (skew, blur, noise, contrast, JPEG) in batches before saving
+    apply_augmentation = True
+    augment_params = dict(
+        skew_range=(-8.0, 8.0),
+        rotation_range=(-2.0, 2.0),
+        blur_sigma_range=(0.0, 1.2),
+        noise_std_range=(0.0, 8.0),
+        contrast_range=(0.7, 1.2),
+        jpeg_quality_range=(30, 95),
+        affine_prob=0.5,
+        blur_prob=0.5,
+        noise_prob=0.5,
+        contrast_prob=0.5,
+        jpeg_prob=0.5,
+    )
+    combined_images = []
+    output_paths = []
+    
     text_size, gen_image, super_or_sub = generate_text_image(
         main_text=main_text,
         super_text=super_text,
@@ -371,11 +444,14 @@ if __name__ == "__main__":
                       "_GenFontColor_" + str(list(generated_text_color)) \
                           + "_" + gen_font + "_" + main_text + "_" + super_text + "_" + sub_text +  ".png"
 
+    # When augmenting, keep the composite in memory and save it after step 3
+    overlay_output_path = None if apply_augmentation else save_image_name
+
     if os.path.exists(background_img):
         ## with background image
-        overlay_on_background(
+        combined_img = overlay_on_background(
             gen_image,
-            save_image_name,
+            overlay_output_path,
             generated_text_color_denorm,
             background_img,
             pad_all=pad_all
@@ -388,13 +464,20 @@ if __name__ == "__main__":
         # make sure the generated background has a good contrast with generated_text        
         generated_text_color, generated_bkground_color, new_ctr = ensure_readable_colors(generated_text_color_denorm, generated_bkground_color)
         
-        overlay_on_background(
+        combined_img = overlay_on_background(
             gen_image,
-            save_image_name,
+            overlay_output_path,
             generated_text_color,
             None,
             generated_bkground_color,
             pad_all
         )
 
+    combined_images.append(combined_img)
+    output_paths.append(save_image_name)
+
+    # Step 3: Augment the composites in batches and save them
+    if apply_augmentation:
+        augment_and_save(combined_images, output_paths, **augment_params)
+
 
@@ -0,0 +1,61 @@
+import numpy as np
+
+from image_augmentation import affine_batch, augment_batch, jpeg_compress_batch
+
+
+def _images(n=5, h=37, w=53, seed=1):
+    return (np.random.default_rng(seed).random((n, h, w, 3)) * 255).astype(np.uint8)
+
+
+def _smooth_planar(n=3, h=48, w=64):
+    # Gradients rather than white noise, so JPEG error behaves like on real images
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    planes = [x * 255 / w, y * 255 / h, (x + y) * 255 / (w + h)]
+    return np.broadcast_to(np.stack(planes), (n, 3, h, w)).copy()
+
+
+def test_all_probabilities_zero_returns_input():
+    images = _images()
+    out = augment_batch(
+        images, rng=np.random.default_rng(0),
+        affine_prob=0, blur_prob=0, noise_prob=0, contrast_prob=0, jpeg_prob=0,
+    )
+    assert out.dtype == np.uint8
+    np.testing.assert_array_equal(out, images)
+
+
+def test_same_seed_same_output_for_any_chunk_size():
+    images = _images(n=11)
+    kwargs = dict(affine_prob=0.7, blur_prob=0.7, noise_prob=0.7, contrast_prob=0.7, jpeg_prob=0.7)
+    for make_rng in (np.random.default_rng, np.random.RandomState):
+        reference = augment_batch(images, rng=make_rng(3), chunk_size=8, **kwargs)
+        assert not np.array_equal(reference, images)
+        for chunk_size in (1, 3, 11, 64):
+            out = augment_batch(images, rng=make_rng(3), chunk_size=chunk_size, **kwargs)
+            np.testing.assert_array_equal(out, reference)
+
+
+def test_global_seed_is_reproducible():
+    images = _images()
+    np.random.seed(42)
+    first = augment_batch(images)
+    np.random.seed(42)
+    np.testing.assert_array_equal(augment_batch(images), first)
+
+
+def test_zero_skew_and_rotation_is_identity():
+    x = _images().transpose(0, 3, 1, 2).astype(np.float32)
+    zeros = np.zeros(len(x))
+    np.testing.assert_allclose(affine_batch(x, zeros, zeros), x, atol=1e-4)
+
+
+def test_jpeg_error_grows_as_quality_drops():
+    x = _smooth_planar()
+    errors = []
+    for quality in (100, 75, 30, 5):
+        out = jpeg_compress_batch(x, np.full(len(x), quality, dtype=np.float32))
+        assert out.shape == x.shape
+        errors.append(np.abs(out - x).mean())
+    assert errors[0] < 1.5
+    assert errors == sorted(errors)
+    assert errors[-1] > 2 * errors[0]
@@ -0,0 +1,17 @@
+import pytest
+
+from import_budget import IMPORT_TIME_MARGIN, MODULES, measure_import
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_no_eager_heavy_imports(module):
+    _, _, loaded = measure_import(module, repeats=1)
+    assert loaded == [], f"{module} eagerly imports {', '.join(loaded)}"
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time_within_budget(module):
+    numpy_time, extra, _ = measure_import(module)
+    assert extra <= IMPORT_TIME_MARGIN * numpy_time, (
+        f"{module} adds {extra:.3f}s to import on top of numpy ({numpy_time:.3f}s)"
+    )